@@ -6,22 +6,135 @@
 # and DownloadThread.
 # License: MIT License
 
+import atexit
+import json
+import os
 import re
-from urllib import request, error
+import time
+from urllib import error
+from urllib.parse import parse_qs, urlsplit
 
+from classes.utils import shared_youtube_dl
 from classes.validators import YouTubeURLValidator
-from config.constants import KEYWORD_LEN, OFFSET_TO_CHANNEL_ID
 
+import requests
 import scrapetube
-import yt_dlp
-from pytube import Playlist
-from pytube.exceptions import PytubeError
+from appdirs import user_cache_dir
 from PyQt6.QtCore import QObject, pyqtSignal as Signal
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The channel ID as it appears in the metadata embedded in a channel page
+_EXTERNAL_ID_RE = re.compile(rb'"externalId"\s*:\s*"([0-9A-Za-z_-]+)"')
+
+# Channel pages are read in chunks of this many bytes until the channel ID
+# is found. The end of each chunk is carried over to the next one, in case
+# the channel ID is split between them.
+_PAGE_CHUNK_SIZE = 16384
+_PAGE_CHUNK_OVERLAP = 128
+
+# Channel IDs and video titles looked up earlier, kept on disk so that they
+# are reused across sessions, and how long each of them stays valid, in
+# seconds
+_LOOKUP_CACHE_FILE = os.path.join(user_cache_dir("yt_chan_dl"),
+                                  'lookups.json')
+_LOOKUP_CACHE_TTLS = {
+    'channel_ids': 7 * 24 * 3600,
+    'video_titles': 24 * 3600,
+}
+
+# The lookup caches by name, each mapping a URL to a [time of the lookup,
+# result] pair. A new YTChannel is created for every fetch, so the caches
+# are kept at module level, and loaded on first use.
+_lookup_caches = None
+_lookup_caches_changed = False
+
+
+def _get_lookup_caches():
+    global _lookup_caches
+    if _lookup_caches is None:
+        try:
+            with open(_LOOKUP_CACHE_FILE, 'rb') as f:
+                stored_caches = json.loads(f.read())
+        except (OSError, ValueError):
+            stored_caches = {}
+        _lookup_caches = {name: stored_caches.get(name, {})
+                          for name in _LOOKUP_CACHE_TTLS}
+    return _lookup_caches
+
+
+def _get_cached(cache_name, url):
+    """Returns the cached result for the URL, or None if it has expired."""
+    cached = _get_lookup_caches()[cache_name].get(url)
+    if cached and time.time() - cached[0] < _LOOKUP_CACHE_TTLS[cache_name]:
+        return cached[1]
+    return None
+
+
+def _set_cached(cache_name, url, result):
+    global _lookup_caches_changed
+    _get_lookup_caches()[cache_name][url] = [time.time(), result]
+    _lookup_caches_changed = True
+
+
+@atexit.register
+def _save_lookup_caches():
+    """Writes the lookup caches to disk, leaving out expired results."""
+    if not _lookup_caches_changed:
+        return
+    now = time.time()
+    caches = {
+        name: {url: cached for url, cached in list(cache.items())
+               if now - cached[0] < _LOOKUP_CACHE_TTLS[name]}
+        for name, cache in _lookup_caches.items()
+    }
+    try:
+        os.makedirs(os.path.dirname(_LOOKUP_CACHE_FILE), exist_ok=True)
+        temp_path = _LOOKUP_CACHE_FILE + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(caches, f, separators=(',', ':'))
+        os.replace(temp_path, _LOOKUP_CACHE_FILE)
+    except OSError as e:
+        print(f"Failed to save the lookup cache: {e}")
+
+
+# yt-dlp options for fetching the metadata of a single video
+_VIDEO_METADATA_OPTS = {
+    'quiet': True,
+    'extract_flat': True,   # Only extract metadata
+    'noplaylist': True,     # Ensure it's not extracting a playlist
+    'skip_download': True,  # Skip the download step entirely
+    'socket_timeout': 10,
+    'extractor_args': {
+        'youtube': {
+            'skip': ['signature']
+        }
+    }
+}
+
+# yt-dlp options for listing the videos of a playlist without visiting each
+# of them
+_PLAYLIST_LISTING_OPTS = {
+    'quiet': True,
+    'extract_flat': 'in_playlist',
+    'skip_download': True,
+    'socket_timeout': 10,
+}
+
+# Flat playlist listings keep private and deleted videos, with these
+# placeholders as their titles
+_UNAVAILABLE_VIDEO_TITLES = frozenset(('[Private video]', '[Deleted video]'))
+
+# URL classifier patterns
+_PLAYLIST_RE = re.compile(r'list=[0-9A-Za-z_-]+')
 
 
 class YTChannel(QObject):
     showError = Signal(str)
 
+    # Shared by all channel page requests, see _get_http_session
+    _http_session = None
+
     def __init__(self, main_window=None, parent=None):
         super().__init__(parent)
         self.main_window = main_window
@@ -34,17 +147,57 @@ class YTChannel(QObject):
 
     def is_playlist_url(self, url):
         """Check if the URL is related to a YouTube playlist."""
-        playlist_pattern = r'list=[0-9A-Za-z_-]+'
-        return re.search(playlist_pattern, url) is not None
+        return _PLAYLIST_RE.search(url) is not None
 
     def is_video_with_playlist_url(self, url):
-        video_with_playlist_pattern = r'youtube\.com/watch\?.*v=.*&list=[0-9A-Za-z_-]+'
-        return re.search(video_with_playlist_pattern, url) is not None
+        if 'youtube.com/watch?' not in url or 'list=' not in url:
+            return False
+        query = parse_qs(urlsplit(url).query)
+        return 'v' in query and 'list' in query
 
     def is_short_video_url(self, url):
         """Check if the URL is related to a YouTube Shorts video."""
         return 'youtube.com/shorts/' in url
 
+    @classmethod
+    def _get_http_session(cls):
+        """
+        Returns the HTTP session used to fetch channel pages. The session is
+        created once, so the connection to YouTube is kept alive between
+        requests, and transient server errors are retried. Connection and
+        read failures aren't retried, and a Retry-After header is ignored:
+        channel pages are fetched on the UI thread, which would otherwise
+        wait for the timeout once per attempt, or for as long as the server
+        asks.
+        """
+        if cls._http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(max_retries=Retry(
+                total=3, connect=0, read=0, backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=False))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            cls._http_session = session
+        return cls._http_session
+
+    @staticmethod
+    def _find_channel_id(response):
+        """
+        Reads a streamed channel page until the channel ID shows up.
+
+        Returns:
+            str: The channel ID, or None if the page doesn't contain it.
+        """
+        tail = b''
+        for chunk in response.iter_content(chunk_size=_PAGE_CHUNK_SIZE):
+            page_part = tail + chunk
+            match = _EXTERNAL_ID_RE.search(page_part)
+            if match:
+                return match.group(1).decode('ascii')
+            tail = page_part[-_PAGE_CHUNK_OVERLAP:]
+        return None
+
     def get_channel_id(self, url):
         if "channel/" in url:
             split_url = url.split("/")
@@ -52,45 +205,58 @@ class YTChannel(QObject):
                 if split_url[i] == "channel":
                     self.channelId = split_url[i+1]
                     return self.channelId
+
+        cached_channel_id = _get_cached('channel_ids', url)
+        if cached_channel_id:
+            self.channelId = cached_channel_id
+            return self.channelId
+
         try:
-            html = request.urlopen(url, timeout=10).read().__str__()
-            channelId_first_index = html.find("externalId") + KEYWORD_LEN + \
-                OFFSET_TO_CHANNEL_ID
-            channelId_last_index = channelId_first_index
-            for symbol in html[channelId_first_index:]:
-                if symbol == '"':
-                    break
-                channelId_last_index += 1
-            self.channelId = html[channelId_first_index: channelId_last_index]
+            # The page is streamed, so the rest of it isn't downloaded once
+            # the channel ID has been found
+            with self._get_http_session().get(url, timeout=10,
+                                              stream=True) as response:
+                response.raise_for_status()
+                channel_id = self._find_channel_id(response)
+            if not channel_id:
+                raise ValueError(f"No channel ID found on {url}")
+            self.channelId = channel_id
+            _set_cached('channel_ids', url, self.channelId)
             return self.channelId
-        except error.HTTPError as e:
-            print(e.__dict__)
-            raise e
-        except error.URLError as e:
-            print(e.__dict__)
-            raise error.URLError("Invalid URL")
+        except requests.RequestException as e:
+            print(e)
+            raise error.URLError("Invalid URL") from e
         except ValueError as e:
             print(e.__dict__)
             raise ValueError
 
-    def retrieve_video_metadata(self, video_url):
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,   # Only extract metadata
-            'noplaylist': True,     # Ensure it's not extracting a playlist
-            'skip_download': True,  # Skip the download step entirely
-            'socket_timeout': 10,
-            'extractor_args': {
-                'youtube': {
-                    'skip': ['signature']
-                }
-            }
-        }
-        
+    def retrieve_video_metadata(self, video_url, ydl=None):
+        """
+        Fetches the title of a video.
+
+        Args:
+            video_url (str): The URL of the video.
+            ydl (yt_dlp.YoutubeDL, optional): The yt-dlp instance to use when
+                fetching several videos in a row. If None, the shared instance
+                for video metadata is used.
+
+        Returns:
+            list: The title and the URL of the video, or None on failure.
+        """
+        import yt_dlp
+
+        cached_title = _get_cached('video_titles', video_url)
+        if cached_title is not None:
+            return [cached_title, video_url]
+
+        if ydl is None:
+            with shared_youtube_dl(_VIDEO_METADATA_OPTS) as ydl:
+                return self.retrieve_video_metadata(video_url, ydl)
+
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                video_info = ydl.extract_info(video_url, download=False)
+            video_info = ydl.extract_info(video_url, download=False)
             vid_title = video_info.get('title', 'Unknown Title')
+            _set_cached('video_titles', video_url, vid_title)
             return [vid_title, video_url]
         except yt_dlp.utils.DownloadError as e:
             print(f"Error fetching video metadata: {e}")
@@ -100,10 +266,12 @@ class YTChannel(QObject):
     def fetch_all_videos_in_channel(self, channel_id):
         try:
             chan_video_entries = scrapetube.get_channel(channel_id)
+            # Looked up once rather than for each of the channel's videos
+            base_video_url = self.base_video_url
+            add_video = self.video_titles_links.append
             for entry in chan_video_entries:
                 vid_title = entry['title']['runs'][0]['text']
-                video_url = self.base_video_url + entry['videoId']
-                self.video_titles_links.append([vid_title, video_url])
+                add_video([vid_title, base_video_url + entry['videoId']])
             return self.video_titles_links
         except TimeoutError:
             self.showError.emit("Failed to fetch channel videos: Timeout reached")
@@ -111,17 +279,41 @@ class YTChannel(QObject):
     def fetch_videos_from_playlist(self, playlist_url):
         if YouTubeURLValidator.playlist_exists(playlist_url):
             try:
-                playlist = Playlist(playlist_url)
+                # The flat listing of the playlist already carries the titles
+                # of its videos, so they don't have to be fetched one by one
+                with shared_youtube_dl(_PLAYLIST_LISTING_OPTS) as ydl:
+                    playlist = ydl.extract_info(playlist_url, download=False)
+
                 video_titles_links = []
+                missing_metadata = []
+                base_video_url = self.base_video_url
+                for entry in playlist.get('entries') or []:
+                    if not entry or not entry.get('id'):
+                        continue
+                    # Unavailable videos could never be downloaded
+                    if entry.get('title') in _UNAVAILABLE_VIDEO_TITLES or \
+                            entry.get('availability') == 'private':
+                        continue
+                    video_url = base_video_url + entry['id']
+                    if entry.get('title'):
+                        video_titles_links.append([entry['title'], video_url])
+                    else:
+                        missing_metadata.append(
+                            (len(video_titles_links), video_url))
+                        video_titles_links.append(None)
 
-                for video_url in playlist.video_urls:
-                    video_data = self.retrieve_video_metadata(video_url)
-                    if video_data:
-                        video_titles_links.append(video_data)
+                # Only the videos listed without a title are fetched one by
+                # one, in a second pass
+                if missing_metadata:
+                    with shared_youtube_dl(_VIDEO_METADATA_OPTS) as ydl:
+                        for index, video_url in missing_metadata:
+                            video_titles_links[index] = \
+                                self.retrieve_video_metadata(video_url, ydl)
 
-                return video_titles_links
+                return [video_data for video_data in video_titles_links
+                        if video_data]
 
-            except (PytubeError, Exception) as e:
+            except Exception as e:
                 print(f"Error fetching playlist details: {e}")
                 self.showError.emit(f"Failed to fetch playlist details: {e}")
                 return []
@@ -130,8 +322,10 @@ class YTChannel(QObject):
         return []
 
     def get_single_video(self, video_url):
+        # The metadata request below fails for videos that don't exist, so
+        # a separate existence check would only repeat the round trip
         validation_result, formatted_url_or_id = YouTubeURLValidator.is_valid(
-            video_url)
+            video_url, cheap=True)
 
         if validation_result:
             video_data = self.retrieve_video_metadata(formatted_url_or_id)
@@ -12,6 +12,10 @@ class CheckBoxDelegate(QtWidgets.QStyledItemDelegate):
 
     def __init__(self, parent=None):
         QtWidgets.QStyledItemDelegate.__init__(self, parent)
+        # The size of the checkbox indicator only depends on the style, so
+        # it is looked up once per style rather than for every cell
+        self._indicator_style = None
+        self._indicator_size = None
 
     def createEditor(self, parent, option, index):
         return None
@@ -30,8 +34,9 @@ class CheckBoxDelegate(QtWidgets.QStyledItemDelegate):
         else:
             check_box_style_option.state |= QtWidgets.QStyle.StateFlag.State_Off
 
-        check_box_style_option.rect = self.getCheckBoxRect(option)
-        QtWidgets.QApplication.style().drawControl(
+        style = QtWidgets.QApplication.style()
+        check_box_style_option.rect = self.getCheckBoxRect(option, style)
+        style.drawControl(
             QtWidgets.QStyle.ControlElement.CE_CheckBox,
             check_box_style_option, painter)
 
@@ -54,19 +59,23 @@ class CheckBoxDelegate(QtWidgets.QStyledItemDelegate):
         self.checkBoxStateChanged.emit()
         return True
 
-    def getCheckBoxRect(self, option):
-        check_box_style_option = QtWidgets.QStyleOptionButton()
-        check_box_rect = QtWidgets.QApplication.style().subElementRect(
-            QtWidgets.QStyle.SubElement.SE_CheckBoxIndicator,
-            check_box_style_option, None)
+    def getCheckBoxRect(self, option, style=None):
+        if style is None:
+            style = QtWidgets.QApplication.style()
+        if style is not self._indicator_style:
+            self._indicator_size = style.subElementRect(
+                QtWidgets.QStyle.SubElement.SE_CheckBoxIndicator,
+                QtWidgets.QStyleOptionButton(), None).size()
+            self._indicator_style = style
+        indicator_size = self._indicator_size
 
         check_box_point = QPoint(
             int(option.rect.x() + option.rect.width() / 2
-                - check_box_rect.width() / 2),
+                - indicator_size.width() / 2),
             int(option.rect.y() + option.rect.height() / 2
-                - check_box_rect.height() / 2)
+                - indicator_size.height() / 2)
         )
-        return QRect(check_box_point, check_box_rect.size())
+        return QRect(check_box_point, indicator_size)
 
     def setModelData(self, editor, model, index):
         newValue = not bool(index.model().data(
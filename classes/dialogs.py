@@ -21,6 +21,7 @@ from .settings_manager import SettingsManager
 
 URL_LOGIN = "https://accounts.google.com/ServiceLogin?service=youtube"
 URL_YOUTUBE = "https://www.youtube.com/"
+COOKIE_SAVE_DELAY_MS = 500
 
 
 class CustomDialog(QDialog):
@@ -56,6 +57,13 @@ class YoutubeLoginDialog(QMainWindow):
         self.profile = QWebEngineProfile.defaultProfile()
         self.cookie_store = self.profile.cookieStore()
 
+        # Cookies are added one at a time while a page loads, so the jar is
+        # saved once they stop coming rather than after every cookie
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(COOKIE_SAVE_DELAY_MS)
+        self.save_timer.timeout.connect(self.save_cookies)
+
         self.load_cookies()
 
         if self.cookies_loaded:
@@ -91,7 +99,7 @@ class YoutubeLoginDialog(QMainWindow):
             rfc2109=False
         )
         self.cookie_jar.set_cookie(py_cookie)
-        self.cookie_jar.save(ignore_discard=True)
+        self.save_timer.start()
 
         if py_cookie.expires:
             self.cookie_expirations[py_cookie.name] = py_cookie.expires
@@ -132,9 +140,13 @@ class YoutubeLoginDialog(QMainWindow):
         except FileNotFoundError:
             pass
 
+    def save_cookies(self):
+        self.save_timer.stop()
+        self.cookie_jar.save(ignore_discard=True)
+
     def clear_cookies(self):
         self.cookie_jar.clear()
-        self.cookie_jar.save(ignore_discard=True)
+        self.save_cookies()
         self.cookies_loaded = False
         self.profile = self.browser.page().profile()
         self.profile.cookieStore().deleteAllCookies()
@@ -156,9 +168,18 @@ class YoutubeLoginDialog(QMainWindow):
 
     def emit_logged_in_signal(self):
         if self.logged_in:
+            # Downloads read the cookies from the file, so make sure it's
+            # up to date before reporting the login
+            if self.save_timer.isActive():
+                self.save_cookies()
             self.logged_in_signal.emit()
             self.close()
 
+    def closeEvent(self, event):
+        if self.save_timer.isActive():
+            self.save_cookies()
+        super().closeEvent(event)
+
     def close_window(self):
         if self.logged_in:
             self.close()
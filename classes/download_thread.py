@@ -6,136 +6,183 @@
 # and DownloadThread.
 # License: MIT License
 
-import glob
+import functools
 import os
-import re
+import time
 import unicodedata
 
-from classes.utils import get_video_format_details
-from classes.settings_manager import SettingsManager
-from config.constants import settings_map
+from classes.utils import create_format_probe, get_video_format_details
+from config.constants import MS_PER_SECOND, PROGRESS_EMIT_INTERVAL_MS
+from PyQt6.QtCore import QThread, pyqtSignal as Signal
 
-import yt_dlp
 
-from PyQt6.QtCore import QThread, pyqtSignal as Signal
+# Spaces become underscores; characters that are illegal in Windows
+# filenames, brackets and hashtags are dropped
+_FILENAME_TRANSLATION = str.maketrans(
+    {' ': '_', **{char: None for char in '\\/*?:"<>|[]#'}})
+
+# Device names that Windows doesn't allow as file names
+_RESERVED_FILENAMES = frozenset({
+    "CON", "PRN", "AUX", "NUL",
+    *(f"COM{i}" for i in range(1, 10)),
+    *(f"LPT{i}" for i in range(1, 10)),
+})
+
+
+@functools.lru_cache(maxsize=4096)
+def sanitize_filename(filename):
+    """
+    Sanitizes the filename by removing illegal characters, emoji, hashtags, and
+    other symbols unsuitable for file names. Also checks against reserved filenames.
+
+    Args:
+        filename (str): The initial filename based on the video title.
+
+    Returns:
+        str: A sanitized filename safe for use in file systems.
+    """
+    # Remove leading and trailing whitespace
+    filename = filename.strip()
+
+    # ASCII titles have no accents or emoji, so they skip the per-character
+    # Unicode work
+    if not filename.isascii():
+        # Normalize Unicode characters to decompose accents and remove emojis
+        filename = unicodedata.normalize("NFKD", filename)
+
+        # Remove emoji and other non-ASCII characters
+        filename = ''.join(c for c in filename if not
+                           unicodedata.category(c).startswith("So"))
+
+    # Replace spaces with underscores and remove characters that are
+    # illegal in Windows filenames and hashtags, in a single pass
+    filename = filename.translate(_FILENAME_TRANSLATION)
+
+    filename = filename[:250]
+
+    # Check for Windows reserved filenames and modify if necessary
+    if filename.upper() in _RESERVED_FILENAMES:
+        filename += "_"
+
+    return filename
 
 
 class DownloadThread(QThread):
     """
-    A QThread subclass that handles downloading videos from YouTube with
-    specificformats and qualities.
+    A QThread subclass that works through a shared queue of videos to
+    download from YouTube with specific formats and qualities.
 
     Attributes:
         downloadProgressSignal (Signal): Signal emitted during the download
         process with progress details.
-        downloadCompleteSignal (Signal): Signal emitted once the download
-        is complete.
+        downloadCompleteSignal (Signal): Signal emitted with the index and
+        the URL of the video once the download is complete.
 
     Args:
-        url (str): The URL of the video to be downloaded.
-        index (int): The index identifier for the download, used for managing
-        multiple downloads.
-        title (str): The title of the video, used for naming the downloaded
-        file.
-        mainWindow (MainWindow): Reference to the main window of the
-        applicationfor UI interactions and semaphore access.
+        download_queue (deque): Queue of pending downloads shared by all
+        download threads. Each item is a (url, index, title,
+        ydl_opts_template, format_preferences) tuple, where url is the URL
+        of the video, index identifies its row in the list, title is used
+        for naming the downloaded file, ydl_opts_template holds the yt-dlp
+        options built by MainWindow._build_ydl_opts, and format_preferences
+        is the preferred video quality and container used to look up the
+        closest available format, or None when the template already defines
+        the format, e.g. for audio-only downloads.
         parent (QObject, optional): The parent QObject. Defaults to None.
     """
 
     downloadProgressSignal = Signal(dict)
-    downloadCompleteSignal = Signal(int)
+    downloadCompleteSignal = Signal(int, str)
 
-    def __init__(self, url, index, title, mainWindow, parent=None):
+    sanitize_filename = staticmethod(sanitize_filename)
+
+    def __init__(self, download_queue, parent=None):
         super().__init__(parent)
-        self.url = url
-        self.index = index
-        self.title = title
-        self.main_window = mainWindow
-        self.settings_manager = SettingsManager()
-        self.user_settings = self.settings_manager.settings
+        self.download_queue = download_queue
+        self.url = None
+        self.index = None
+        self.title = None
+        self._last_progress_emit = 0
 
     def run(self):
         """
-        Executes the download process in a separate thread with exception handling.
-        Configures download options based on user preferences, fetches the video,
-        and emits signals to update the UI on progress and completion.
+        Downloads queued videos one after another until the queue is empty.
+        The yt-dlp instance used to look up the available formats is created
+        once and reused for every video the thread downloads.
         """
-        self.main_window.download_semaphore.acquire()
+        format_probes = {}
         try:
-            sanitized_title = self.sanitize_filename(self.title)
-            download_directory = self.user_settings.get('download_directory')
-            write_thumbnail = self.user_settings.get('download_thumbnail')
-
-            ydl_opts = {
-                'outtmpl': os.path.join(download_directory, f'{sanitized_title}.%(ext)s'),
-                'progress_hooks': [self.dl_hook],
-                'writethumbnail': write_thumbnail,
-            }
-
-            # Cookie settings for logged-in users
-            if self.main_window.youtube_login_dialog and \
-                    self.main_window.youtube_login_dialog.logged_in:
-                cookie_file_path = self.main_window.youtube_login_dialog.\
-                    cookie_jar_path
-                ydl_opts['cookiefile'] = cookie_file_path
-            else:
-                cookie_file_path = None
+            while True:
+                try:
+                    (self.url, self.index, self.title, ydl_opts_template,
+                     format_preferences) = self.download_queue.popleft()
+                except IndexError:
+                    break
+                self.download(ydl_opts_template, format_preferences,
+                              format_probes)
+        finally:
+            for format_probe in format_probes.values():
+                format_probe.close()
 
-            # Set video format and quality preferences
-            video_format = settings_map['preferred_video_format'].get(
-                self.user_settings.get('preferred_video_format', 'Any'), 'Any')
-            video_quality = settings_map['preferred_video_quality'].get(
-                self.user_settings.get('preferred_video_quality', 'bestvideo'),
-                'Any')
-
-            closest_format_id = get_video_format_details(self.url,
-                                                         video_quality,
-                                                         video_format,
-                                                         cookie_file_path)
-
-            if closest_format_id:
-                ydl_opts['format'] = f"{closest_format_id}+bestaudio"
-            elif video_quality:
-                ydl_opts['format'] = video_quality
-            else:
-                ydl_opts['format'] = 'bestvideo+bestaudio'
-
-            # Set audio-only download options if enabled
-            if self.user_settings.get('audio_only'):
-                audio_format = settings_map['preferred_audio_format'].get(
-                    self.user_settings.get('preferred_audio_format', 'Any'),
-                    'Any')
-                audio_quality = settings_map['preferred_audio_quality'].get(
-                    self.user_settings.get('preferred_audio_quality',
-                                           'Best available'), 'bestaudio')
-                if audio_format and audio_format != 'Any':
-                    audio_filter = f"[ext={audio_format}]"
-                    ydl_opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': audio_format
-                    }]
-                else:
-                    audio_filter = ''
-                ydl_opts['format'] = \
-                    f"{audio_quality}{audio_filter}/bestaudio/best"
+    def download(self, ydl_opts_template, format_preferences, format_probes):
+        """
+        Downloads the current video with exception handling.
+        Completes the prebuilt download options with the output template and
+        the closest available format, fetches the video, and emits signals to
+        update the UI on progress and completion.
+
+        Args:
+            ydl_opts_template (dict): yt-dlp options shared by every download
+            of the batch.
+            format_preferences (tuple): The preferred video quality and
+            container, or None.
+            format_probes (dict): yt-dlp instances used for format lookups,
+            keyed by cookie file path and proxy, reused across downloads.
+        """
+        # yt-dlp takes a while to import, so it is loaded on first download
+        # rather than when the application starts
+        import yt_dlp
 
-                # Set proxy if needed
-                proxy_type = self.user_settings.get('proxy_server_type', None)
-                proxy_addr = self.user_settings.get('proxy_server_addr', None)
-                proxy_port = self.user_settings.get('proxy_server_port', None)
+        self._last_progress_emit = 0
+        try:
+            sanitized_title = self.sanitize_filename(self.title)
 
-                if proxy_type and proxy_addr and proxy_port:
-                    ydl_opts['proxy'] = f"{proxy_type}://{proxy_addr}:{proxy_port}"
+            ydl_opts = dict(ydl_opts_template)
+            ydl_opts['outtmpl'] = f'{sanitized_title}.%(ext)s'
+            ydl_opts['progress_hooks'] = [self.dl_hook]
+
+            # Set video format and quality preferences
+            video_info = None
+            if format_preferences:
+                video_quality, video_format = format_preferences
+                # The formats are looked up under the same network options
+                # as the download, as the extracted info is reused for it
+                probe_key = (ydl_opts.get('cookiefile'), ydl_opts.get('proxy'))
+                if probe_key not in format_probes:
+                    format_probes[probe_key] = create_format_probe(*probe_key)
+                closest_format_id, video_info = get_video_format_details(
+                    self.url, video_quality, video_format,
+                    ydl=format_probes[probe_key])
+
+                if closest_format_id:
+                    ydl_opts['format'] = f"{closest_format_id}+bestaudio"
 
             # Attempt to download the video with yt-dlp
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([self.url])
+                if video_info:
+                    # Reuse the info extracted while looking up the formats
+                    ydl.process_ie_result(video_info, download=True)
+                else:
+                    ydl.download([self.url])
 
             # Emit signal on successful download
-            self.downloadCompleteSignal.emit(self.index)
+            self.downloadCompleteSignal.emit(self.index, self.url)
 
-        except yt_dlp.utils.DownloadError as e:
-            # Handle yt-dlp-specific download errors
+        except (yt_dlp.utils.DownloadError,
+                yt_dlp.utils.UnavailableVideoError) as e:
+            # Handle yt-dlp-specific download errors. ydl.download reports
+            # an unavailable video as a DownloadError, but process_ie_result
+            # lets the UnavailableVideoError through
             print(f"Download error for {self.url}: {e}")
             self.downloadProgressSignal.emit({"index": str(self.index),
                                               "error": "Download error"})
@@ -152,10 +199,6 @@ class DownloadThread(QThread):
             self.downloadProgressSignal.emit({"index": str(self.index),
                                               "error": "Unexpected error"})
 
-        finally:
-            # Release semaphore regardless of outcome
-            self.main_window.download_semaphore.release()
-
     def dl_hook(self, d):
         """
         Callback function used by yt-dlp to handle download progress updates.
@@ -165,80 +208,76 @@ class DownloadThread(QThread):
             ongoing download.
         """
         if d['status'] == 'downloading':
-            progress_str = d['_percent_str']
-            ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-            progress_str = ansi_escape.sub('', progress_str)
-            progress = float(progress_str.strip('%'))
+            # The progress is computed from the byte counts rather than
+            # parsed from the colored percentage string yt-dlp displays
+            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not total_bytes:
+                return
+            progress = round(d.get('downloaded_bytes', 0) * 100 / total_bytes,
+                             1)
+
+            # yt-dlp reports progress many times a second on fast
+            # connections, while every signal crosses over to the UI thread,
+            # so updates are sent at a limited rate. Completion is reported
+            # separately by downloadCompleteSignal.
+            now = time.monotonic()
+            if (now - self._last_progress_emit) * MS_PER_SECOND < \
+                    PROGRESS_EMIT_INTERVAL_MS and progress < 100:
+                return
+            self._last_progress_emit = now
             self.downloadProgressSignal.emit(
                 {"index": str(self.index), "progress": f"{progress} %"}
                 )
 
-    @staticmethod
-    def sanitize_filename(filename):
-        """
-        Sanitizes the filename by removing illegal characters, emoji, hashtags, and
-        other symbols unsuitable for file names. Also checks against reserved filenames.
-
-        Args:
-            filename (str): The initial filename based on the video title.
-
-        Returns:
-            str: A sanitized filename safe for use in file systems.
-        """
-        # Remove leading and trailing whitespace
-        filename = filename.strip()
-
-        # Normalize Unicode characters to decompose accents and remove emojis
-        filename = unicodedata.normalize("NFKD", filename)
-
-        # Remove emoji and other non-ASCII characters
-        filename = ''.join(c for c in filename if not
-                           unicodedata.category(c).startswith("So"))
-
-        # Replace spaces with underscores
-        filename = filename.replace(' ', '_')
-
-        # Remove characters that are illegal in Windows filenames and hashtags
-        filename = re.sub(r'[\\/*?:"<>|\[\]#]', '', filename)
-
-        filename = filename[:250]
-
-        # Check for Windows reserved filenames and modify if necessary
-        reserved_filenames = {
-            "CON", "PRN", "AUX", "NUL", "COM1", "COM2", "COM3", "COM4", "COM5",
-            "COM6", "COM7", "COM8", "COM9", "LPT1", "LPT2", "LPT3", "LPT4",
-            "LPT5", "LPT6", "LPT7", "LPT8", "LPT9"
-        }
-        if filename.upper() in reserved_filenames:
-            filename += "_"
-
-        return filename
-
     @staticmethod
     def is_download_complete(filepath):
         """
         Checks if the download for a given file is complete by looking for
         temporary `.part` or `.ytdl` files.
 
+        The download directory is listed with prebuild_completion_index, so
+        this check and the completion index always agree.
+
         Args:
             filepath (str): The path to the file without the extension.
 
         Returns:
             bool: True if the download is complete, False otherwise.
         """
+        directory, file_name = os.path.split(filepath)
+        return file_name in DownloadThread.prebuild_completion_index(directory)
 
-        part_files = glob.glob(f"{filepath}*.part")
-        ytdl_files = glob.glob(f"{filepath}*.ytdl")
-
-        # If any partially downloaded files are found,
-        # the download is incomplete
-        if part_files or ytdl_files:
-            return False
+    @staticmethod
+    def prebuild_completion_index(download_dir):
+        """
+        Lists the download directory once and records the names of the
+        completely downloaded files, so that the completion of many videos
+        can be checked without listing the directory for each of them.
 
-        matching_files = glob.glob(f"{filepath}.*")
+        Args:
+            download_dir (str): The download directory.
 
-        # Otherwise only completely downloaded files would be found
-        if not matching_files:
-            return False
+        Returns:
+            frozenset: The file names, without the extension, of the complete
+            downloads. A video is complete if the base name of its file path
+            is in the set.
+        """
+        found_prefixes = set()
+        partial_prefixes = set()
+        try:
+            with os.scandir(download_dir or os.curdir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    # Every part of the name before a dot may be the file
+                    # name of a video, e.g. both "a" and "a.b" for "a.b.mp4"
+                    prefixes = [name[:i] for i, char in enumerate(name)
+                                if char == '.' and i]
+                    if name.endswith(('.part', '.ytdl')):
+                        partial_prefixes.update(prefixes)
+                    else:
+                        found_prefixes.update(prefixes)
+        except OSError:
+            return frozenset()
+
+        return frozenset(found_prefixes - partial_prefixes)
 
-        return True
@@ -17,6 +17,7 @@ class LoginPromptDialog(QDialog):
 
     def toggle_show_again(self, state):
         is_checked = bool(state)
-        settings = self.settings_manager.settings
+        settings = dict(self.settings_manager.settings)
         settings['dont_show_login_prompt'] = is_checked
+        self.settings_manager.settings = settings
         self.settings_manager.save_settings_to_file(settings)
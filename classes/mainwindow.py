@@ -6,6 +6,7 @@
 # and DownloadThread.
 # License: MIT License
 
+from collections import deque
 from urllib import error
 import os
 import math
@@ -15,7 +16,7 @@ from PyQt6.QtCore import Qt, pyqtSlot as Slot
 from PyQt6 import QtGui, QtCore
 from PyQt6.QtWidgets import QHeaderView
 from PyQt6.QtWidgets import QApplication, QMainWindow, QDialog, QCheckBox, QMessageBox
-from PyQt6.QtCore import QSemaphore
+from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QFont
 from PyQt6.QtGui import QFontMetrics
 from PyQt6.QtCore import QUrl
@@ -35,6 +36,8 @@ from classes.delegates import CheckBoxDelegate
 from classes.YTChannel import YTChannel
 from classes.videoitem import VideoItem
 from classes.settings import SettingsDialog
+from config.constants import settings_map, PROGRESS_REPAINT_INTERVAL_MS, \
+    MAX_SIMULTANEOUS_DOWNLOADS
 
 
 class MainWindow(QMainWindow):
@@ -45,8 +48,8 @@ class MainWindow(QMainWindow):
     YouTube login.
 
     Attributes:
-        download_semaphore (QSemaphore): Controls the maximum number of
-                                         simultaneous downloads.
+        max_simultaneous_downloads (int): The maximum number of download
+                                          threads running at once.
         ui (Ui_MainWindow): Main UI layout.
         model (QStandardItemModel): Data model for displaying downloadable
                                     videos in a tree view.
@@ -59,6 +62,8 @@ class MainWindow(QMainWindow):
                                           and link data.
         vid_dl_indexes (list): List of indexes of videos to download.
         dl_threads (list): List of download threads.
+        pending_downloads (deque): Videos waiting to be downloaded, shared
+                                   by the running download threads.
         dl_path_correspondences (dict): Map between video download paths and
                                         video data.
     """
@@ -78,7 +83,7 @@ class MainWindow(QMainWindow):
 
         # Limit to 4 simultaneous downloads
         # TODO: Make this controllable in the Settings
-        self.download_semaphore = QSemaphore(4)
+        self.max_simultaneous_downloads = MAX_SIMULTANEOUS_DOWNLOADS
 
         self.set_icon()
         self.setup_ui()
@@ -184,7 +189,7 @@ class MainWindow(QMainWindow):
         self.ui.actionAbout.triggered.connect(self.show_about_dialog)
         self.ui.actionSettings.triggered.connect(self.show_settings_dialog)
         self.ui.actionExit.triggered.connect(self.exit)
-        self.model.itemChanged.connect(self.update_download_button_state)
+        self.model.itemChanged.connect(self.on_item_changed)
         self.update_download_button_state()
 
         for download_thread in self.dl_threads:
@@ -238,8 +243,17 @@ class MainWindow(QMainWindow):
         """Initializes download-related structures."""
         self.vid_dl_indexes = []
         self.dl_threads = []
+        self.pending_downloads = deque()
+        self.active_dl_thread_count = 0
         self.dl_path_correspondences = {}
 
+        # Progress updates are coalesced and applied on a single timer tick
+        self._pending_progress = {}
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(PROGRESS_REPAINT_INTERVAL_MS)
+        self._repaint_timer.timeout.connect(self._flush_progress)
+
     def initialize_youtube_login(self):
         """Initialize YouTube login functionality by connecting the login
         action to the login handler and checking the login status.
@@ -360,6 +374,10 @@ class MainWindow(QMainWindow):
         excluded from selection toggling.
         """
         new_value = state == 2
+        # Every video is downloaded to the same directory, so it is listed
+        # once rather than for each row
+        completion_index = DownloadThread.prebuild_completion_index(
+            self.user_settings.get('download_directory', './'))
 
         for row in range(self.model.rowCount()):
             item_title_index = self.model.index(row, 1)
@@ -367,7 +385,7 @@ class MainWindow(QMainWindow):
             full_file_path = self.dl_path_correspondences[item_title]
 
             if full_file_path and \
-               DownloadThread.is_download_complete(full_file_path):
+               os.path.basename(full_file_path) in completion_index:
                 continue
 
             index = self.model.index(row, 0)
@@ -402,6 +420,11 @@ class MainWindow(QMainWindow):
         """
         self.model.clear()
         self.root_item = self.model.invisibleRootItem()
+        self._checked_rows.clear()
+        # Queued videos refer to rows of the previous list. The downloads
+        # that already started are left to finish.
+        self.pending_downloads.clear()
+        self.ui.downloadSelectedVidsButton.setEnabled(False)
         self.model.setHorizontalHeaderLabels(
             ['Download?', 'Title', 'Link', 'Progress'])
         self.ui.treeView.setModel(self.model)
@@ -464,15 +487,33 @@ class MainWindow(QMainWindow):
     def update_download_button_state(self):
         """Enable or disable the download button based on item selection.
 
-        Scans through the model's items to determine if any are selected for
-        download. If at least one item is selected, the download button is
-        enabled; otherwise, it is disabled.
+        Scans through the model's items to rebuild the set of rows selected
+        for download. If at least one item is selected, the download button
+        is enabled; otherwise, it is disabled. Single checkbox changes are
+        tracked by on_item_changed without a scan; this method is meant for
+        after the whole list has changed.
         """
-        self.ui.downloadSelectedVidsButton.setEnabled(False)
+        self._checked_rows = set()
         for row in range(self.model.rowCount()):
             item = self.model.item(row, 0)
             if item.checkState() == Qt.CheckState.Checked:
-                self.ui.downloadSelectedVidsButton.setEnabled(True)
+                self._checked_rows.add(row)
+        self.ui.downloadSelectedVidsButton.setEnabled(bool(self._checked_rows))
+
+    def on_item_changed(self, item):
+        """Keep the set of selected rows and the download button state up to
+        date when a single item changes.
+
+        Parameters:
+            item (QStandardItem): The item that has changed.
+        """
+        if item.column() != ColumnIndexes.DOWNLOAD:
+            return
+        if item.checkState() == Qt.CheckState.Checked:
+            self._checked_rows.add(item.row())
+        else:
+            self._checked_rows.discard(item.row())
+        self.ui.downloadSelectedVidsButton.setEnabled(bool(self._checked_rows))
 
     @Slot(str)
     def display_error_dialog(self, message):
@@ -509,20 +550,39 @@ class MainWindow(QMainWindow):
             yt_channel.fetch_all_videos_in_channel(channel_id)
 
     def populate_window_list(self):
-        """Populates the main window's list view with video details."""
-        self.reinit_model()
-        for title, link in self.yt_chan_vids_titles_links:
-            self._add_video_item_to_list(title, link)
+        """Populates the main window's list view with video details.
 
+        The rows are appended with the model's signals blocked, so the view
+        and the download button state are updated once for the whole list
+        instead of once per row.
+        """
+        self.reinit_model()
+        self.ui.treeView.setUpdatesEnabled(False)
+        self.model.blockSignals(True)
+        try:
+            completion_index = DownloadThread.prebuild_completion_index(
+                self.user_settings.get('download_directory', './'))
+            for title, link in self.yt_chan_vids_titles_links:
+                self._add_video_item_to_list(title, link, completion_index)
+        finally:
+            # Restored even if a row fails, or the model and the view would
+            # stay frozen for the rest of the session
+            self.model.blockSignals(False)
+
+            # The view missed the row insertions, so let it rebuild its
+            # layout
+            self.ui.treeView.reset()
+            self.ui.treeView.setUpdatesEnabled(True)
+        self.update_download_button_state()
         self._finalize_list_view()
 
-    def _add_video_item_to_list(self, title, link):
+    def _add_video_item_to_list(self, title, link, completion_index=None):
         """
         Adds a single video entry to the list view by creating a VideoItem,
         setting its properties, and appending it to the root item.
         """
         download_path = self._get_video_filepath(title)
-        video_item = VideoItem(title, link, download_path)
+        video_item = VideoItem(title, link, download_path, completion_index)
         self.root_item.appendRow(video_item.get_qt_item())
         self.dl_path_correspondences[title] = download_path
 
@@ -660,24 +720,104 @@ class MainWindow(QMainWindow):
         """
         Initiates the download process for all checked videos in the list.
         Clears existing download indexes, identifies checked items, and
-        starts a download thread for each selected video.
+        queues each selected video for download. Up to
+        max_simultaneous_downloads download threads work through the queue,
+        each downloading one video after another.
         """
         self.vid_dl_indexes.clear()
         for row in range(self.model.rowCount()):
             item = self.model.item(row, 0)
             if item.checkState() == Qt.CheckState.Checked:
                 self.vid_dl_indexes.append(row)
+        ydl_opts, format_preferences = self._build_ydl_opts()
         for index in self.vid_dl_indexes:
             progress_item = QtGui.QStandardItem()
             self.model.setItem(index, 3, progress_item)
             link = self.model.item(index, 2).text()
             title = self.model.item(index, 1).text()
-            dl_thread = DownloadThread(link, index, title, self)
-            dl_thread.downloadCompleteSignal.connect(self.populate_window_list)
+            self.pending_downloads.append((link, index, title, ydl_opts,
+                                           format_preferences))
+        self._start_pending_downloads()
+
+    def _start_pending_downloads(self):
+        """Starts download threads for the queued videos while download
+        slots are free."""
+        thread_count = min(
+            len(self.pending_downloads),
+            self.max_simultaneous_downloads - self.active_dl_thread_count)
+        for _ in range(thread_count):
+            dl_thread = DownloadThread(self.pending_downloads)
+            dl_thread.downloadCompleteSignal.connect(self.mark_row_complete)
             dl_thread.downloadProgressSignal.connect(self.update_progress)
+            dl_thread.finished.connect(self._on_download_thread_finished)
             self.dl_threads.append(dl_thread)
+            self.active_dl_thread_count += 1
             dl_thread.start()
 
+    @Slot()
+    def _on_download_thread_finished(self):
+        """Frees the slot of a finished download thread and starts a new one
+        if videos are still queued."""
+        self.active_dl_thread_count -= 1
+        self._start_pending_downloads()
+
+    def _build_ydl_opts(self):
+        """
+        Resolves the user settings into the yt-dlp options shared by every
+        download of a batch, so that each DownloadThread only has to add its
+        own output template and progress hook.
+
+        Returns:
+            tuple: The yt-dlp options dict, and a (video_quality,
+            video_format) tuple used to look up the closest available format
+            of each video, or None when the options already define the format.
+        """
+        user_settings = self.settings_manager.settings
+        ydl_opts = {
+            'paths': {'home': user_settings.get('download_directory', './')},
+            'writethumbnail': user_settings.get('download_thumbnail'),
+        }
+
+        # Cookie settings for logged-in users
+        if self.youtube_login_dialog and self.youtube_login_dialog.logged_in:
+            ydl_opts['cookiefile'] = self.youtube_login_dialog.cookie_jar_path
+
+        # Set proxy if needed
+        proxy_type = user_settings.get('proxy_server_type', None)
+        proxy_addr = user_settings.get('proxy_server_addr', None)
+        proxy_port = user_settings.get('proxy_server_port', None)
+
+        if proxy_type and proxy_addr and proxy_port:
+            ydl_opts['proxy'] = f"{proxy_type}://{proxy_addr}:{proxy_port}"
+
+        # Set audio-only download options if enabled
+        if user_settings.get('audio_only'):
+            audio_format = settings_map['preferred_audio_format'].get(
+                user_settings.get('preferred_audio_format', 'Any'), 'Any')
+            audio_quality = settings_map['preferred_audio_quality'].get(
+                user_settings.get('preferred_audio_quality',
+                                  'Best available'), 'bestaudio')
+            if audio_format and audio_format != 'Any':
+                audio_filter = f"[ext={audio_format}]"
+                ydl_opts['postprocessors'] = [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': audio_format
+                }]
+            else:
+                audio_filter = ''
+            ydl_opts['format'] = f"{audio_quality}{audio_filter}/bestaudio/best"
+            return ydl_opts, None
+
+        # Set video format and quality preferences
+        video_format = settings_map['preferred_video_format'].get(
+            user_settings.get('preferred_video_format', 'Any'), 'Any')
+        video_quality = settings_map['preferred_video_quality'].get(
+            user_settings.get('preferred_video_quality', 'bestvideo'), 'Any')
+
+        # Used when no closest format can be found for a video
+        ydl_opts['format'] = video_quality or 'bestvideo+bestaudio'
+        return ydl_opts, (video_quality, video_format)
+
     @Slot(dict)
     def update_progress(self, progress_data):
         """
@@ -688,11 +828,43 @@ class MainWindow(QMainWindow):
                                 and its current progress percentage.
         """
         file_index = int(progress_data["index"])
-        progress = progress_data["progress"]
-        progress_item = QtGui.QStandardItem(str(progress))
-        self.model.setItem(int(file_index), 3, progress_item)
+        self._pending_progress[file_index] = progress_data["progress"]
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
+    def _flush_progress(self):
+        """
+        Applies the progress updates received since the last tick and
+        repaints the tree view once for all of them.
+        """
+        pending, self._pending_progress = self._pending_progress, {}
+        for file_index, progress in pending.items():
+            progress_item = QtGui.QStandardItem(str(progress))
+            self.model.setItem(file_index, 3, progress_item)
         self.ui.treeView.viewport().update()
 
+    @Slot(int, str)
+    def mark_row_complete(self, index, link):
+        """
+        Marks a single row of the list as downloaded, without rebuilding
+        the whole model.
+
+        Args:
+            index (int): The row of the video whose download has completed.
+            link (str): The URL of the video. Another list may have been
+                loaded since the download started, in which case the row no
+                longer holds this video and is left as it is.
+        """
+        row_items = [self.model.item(index, column)
+                     for column in range(self.model.columnCount())]
+        if None in row_items or \
+                row_items[ColumnIndexes.LINK].text() != link:
+            return
+        # Drop a pending progress value so it can't overwrite the status
+        self._pending_progress.pop(index, None)
+        VideoItem.deactivate_row(row_items)
+        row_items[ColumnIndexes.PROGRESS].setText("Complete")
+
     def exit(self):
         """
         Exits the application by closing the PyQt main window.
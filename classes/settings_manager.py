@@ -1,6 +1,8 @@
 import json
 import os
 import platform
+import threading
+import types
 from pathlib import Path
 
 from appdirs import user_config_dir
@@ -8,21 +10,58 @@ from appdirs import user_config_dir
 from config.constants import DEFAULT_VIDEO_FORMAT, DEFAULT_AUDIO_FORMAT, \
     DEFAULT_VIDEO_QUALITY, DEFAULT_AUDIO_QUALITY
 
+# orjson parses and serializes noticeably faster than the standard library,
+# but it is optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(settings):
+    if orjson is not None:
+        return orjson.dumps(settings)
+    return json.dumps(settings, separators=(',', ':')).encode()
+
 
 class SettingsManager:
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(SettingsManager, cls).__new__(cls)
-            cls._instance.config_directory = \
-                cls._instance.get_config_directory()
-            cls._instance.config_file_path = \
-                os.path.join(cls._instance.config_directory,
-                             'user_settings.json')
-            cls._instance.settings = cls._instance.load_settings()
+            with cls._lock:
+                # Another thread may have created the instance while this
+                # one was waiting for the lock
+                if cls._instance is None:
+                    instance = super(SettingsManager, cls).__new__(cls)
+                    instance.config_directory = \
+                        instance.get_config_directory()
+                    instance.config_file_path = \
+                        os.path.join(instance.config_directory,
+                                     'user_settings.json')
+                    instance._last_serialized = None
+                    instance.settings = instance.load_settings()
+                    cls._instance = instance
         return cls._instance
 
+    @property
+    def settings(self):
+        """A read-only view of the current settings. Reading it takes no
+        lock, so it can be shared freely between threads."""
+        return self._settings_view
+
+    @settings.setter
+    def settings(self, new_settings):
+        self._settings = dict(new_settings)
+        self._settings_view = types.MappingProxyType(self._settings)
+
     def get_config_directory(self):
         app_dir_name = "yt_chan_dl"
         config_directory = user_config_dir(app_dir_name)
@@ -34,8 +73,8 @@ class SettingsManager:
 
     def read_settings_from_file(self):
         try:
-            with open(self.config_file_path, 'r') as f:
-                return json.load(f)
+            with open(self.config_file_path, 'rb') as f:
+                return _loads(f.read())
         except FileNotFoundError:
             default_settings = self.load_default_settings()
             self.save_settings_to_file(default_settings)
@@ -64,5 +103,14 @@ class SettingsManager:
         }
 
     def save_settings_to_file(self, settings):
-        with open(self.config_file_path, 'w') as f:
-            json.dump(settings, f)
+        serialized = _dumps(settings)
+        # Skip the write if the file already holds these settings
+        if serialized == self._last_serialized:
+            return
+        # Write to a temporary file first so the settings file is replaced
+        # atomically and never left half-written
+        tmp_file_path = self.config_file_path + '.tmp'
+        with open(tmp_file_path, 'wb') as f:
+            f.write(serialized)
+        os.replace(tmp_file_path, self.config_file_path)
+        self._last_serialized = serialized
@@ -6,7 +6,14 @@
 # and DownloadThread.
 # License: MIT License
 
-import yt_dlp
+import atexit
+import contextlib
+import copy
+import threading
+
+# yt-dlp instances shared by metadata lookups, keyed by their options
+_shared_ydls = {}
+_shared_ydls_lock = threading.Lock()
 
 
 def find_best_format_by_resolution(formats, target_resolution, target_ext="Any"):
@@ -71,45 +78,142 @@ def find_closest_resolution_with_fallback(formats, target_resolution):
         return None
 
     target_height = int(target_resolution[:-1])
-    available_resolutions = sorted([f.get('height') for f in formats if f.get('height')])
-
-    # First, check if the target resolution is available
-    if target_height in available_resolutions:
-        for format in formats:
-            if format.get('height') == target_height:
-                return format['format_id']
 
-    # Find the next closest resolution, either higher or lower
-    closest_resolution = min(available_resolutions, key=lambda x: abs(x - target_height))
+    # Single pass: keep the first format of the closest height, preferring
+    # the lower height when two are equally close
+    closest_format = None
+    closest_height = closest_diff = None
     for format in formats:
-        if format.get('height') == closest_resolution:
-            return format['format_id']
+        height = format.get('height')
+        if not height:
+            continue
+        diff = abs(height - target_height)
+        if closest_format is None or diff < closest_diff or \
+                (diff == closest_diff and height < closest_height):
+            closest_format = format
+            closest_height, closest_diff = height, diff
+
+    return closest_format['format_id'] if closest_format else None
+
 
-    return None
+def create_format_probe(cookie_file_path=None, proxy=None):
+    """
+    Creates the yt-dlp instance used to look up the formats of a video. The
+    instance can be reused for several lookups and should be closed once it
+    is no longer needed.
+
+    Parameters:
+    - cookie_file_path (str): The cookie file of a logged in user, if any.
+    - proxy (str): The proxy the video will be downloaded through, if any.
+      The stream URLs YouTube returns are only valid for the IP address that
+      requested them, so the formats must be looked up through the same
+      proxy.
 
+    Returns:
+    - yt_dlp.YoutubeDL: The yt-dlp instance.
+    """
+    import yt_dlp
 
-def get_video_format_details(url, target_resolution, target_ext, cookie_file_path=None):
     ydl_opts = {
         'quiet': True,
         'dump_single_json': True,
         'cookiefile': cookie_file_path,
         'noplaylist': True,
     }
+    if proxy:
+        ydl_opts['proxy'] = proxy
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
+def get_video_format_details(url, target_resolution, target_ext,
+                             cookie_file_path=None, ydl=None, proxy=None):
+    """
+    Looks up the formats of a video and picks the one closest to the target
+    resolution and container.
+
+    Parameters:
+    - url (str): The URL of the video.
+    - target_resolution (str): The desired video resolution (e.g., '1080p').
+    - target_ext (str): The desired video container extension, or None.
+    - cookie_file_path (str): The cookie file of a logged in user, if any.
+    - ydl (yt_dlp.YoutubeDL): A format probe to reuse, see
+      create_format_probe. A new one is created if None.
+    - proxy (str): The proxy to look up the formats through when a new
+      format probe is created, if any.
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(url, download=False)
-            formats = info.get('formats', [])
+    Returns:
+    - tuple: The format_id of the closest format and the extracted video
+      info, which can be passed on to the download so the video doesn't have
+      to be extracted again. The info is left unprocessed, so that the
+      download selects the formats it is configured with, rather than those
+      the probe would pick. (None, None) if extraction fails.
+    """
+    import yt_dlp
+
+    if ydl is None:
+        with create_format_probe(cookie_file_path, proxy) as ydl:
+            return get_video_format_details(url, target_resolution,
+                                            target_ext, ydl=ydl)
+
+    try:
+        info = ydl.extract_info(url, download=False, process=False)
+        formats = info.get('formats', [])
+
+        if target_ext is None:
+            closest_format_id = find_best_format_by_resolution(
+                formats, target_resolution)
+        else:
+            closest_format_id = find_best_format_by_resolution(
+                formats, target_resolution, target_ext)
+
+        return closest_format_id, info
+
+    except yt_dlp.utils.DownloadError as e:
+        print(f"Error extracting info: {e}")
+        return None, None
 
-            if target_ext is None:
-                closest_format_id = find_best_format_by_resolution(
-                    formats, target_resolution)
-            else:
-                closest_format_id = find_best_format_by_resolution(
-                    formats, target_resolution, target_ext)
 
-            return closest_format_id
+def _freeze_ydl_opts(value):
+    """Turns yt-dlp options into a hashable key."""
+    if isinstance(value, dict):
+        return frozenset((key, _freeze_ydl_opts(item))
+                         for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_ydl_opts(item) for item in value)
+    return value
 
-        except yt_dlp.utils.DownloadError as e:
-            print(f"Error extracting info: {e}")
-            return None
+
+@contextlib.contextmanager
+def shared_youtube_dl(ydl_opts):
+    """
+    Provides a yt-dlp instance for metadata lookups. Instances are created
+    once per set of options and reused by later lookups with the same
+    options, which saves loading the extractors every time. Only one thread
+    uses an instance at a time.
+
+    The options are copied before being handed to yt-dlp, which fills in
+    its defaults in place, so callers can pass module-level option templates
+    without them being changed.
+
+    Parameters:
+    - ydl_opts (dict): The yt-dlp options.
+
+    Yields:
+    - yt_dlp.YoutubeDL: The shared yt-dlp instance.
+    """
+    import yt_dlp
+
+    key = _freeze_ydl_opts(ydl_opts)
+    with _shared_ydls_lock:
+        if key not in _shared_ydls:
+            _shared_ydls[key] = (yt_dlp.YoutubeDL(copy.deepcopy(ydl_opts)),
+                                 threading.Lock())
+        ydl, ydl_lock = _shared_ydls[key]
+    with ydl_lock:
+        yield ydl
+
+
+@atexit.register
+def _close_shared_youtube_dls():
+    for ydl, _ in _shared_ydls.values():
+        ydl.close()
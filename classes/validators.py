@@ -7,74 +7,88 @@
 # License: MIT License
 
 import re
-from urllib.error import HTTPError
-import yt_dlp
-from pytube import Playlist
-from pytube.exceptions import PytubeError
+
+from classes.utils import shared_youtube_dl
+
+# Pattern for regular YouTube videos, YouTube Shorts and direct video IDs,
+# matched in a single pass against the whole input. Video URLs may carry
+# further query parameters after the video ID, but nothing may run on from
+# the ID itself.
+_VIDEO_RE = re.compile(
+    r'(?:https?://)?(?:www\.)?'
+    r'(?:(?:youtube\.com|youtu\.?be)/watch\?v=(?P<watch>[0-9A-Za-z_-]{11})'
+    r'(?:[&#].*)?'
+    r'|youtube\.com/shorts/(?P<shorts>[0-9A-Za-z_-]{11})(?:[/?&#].*)?)'
+    r'|(?P<id>[0-9A-Za-z_-]{11})')
 
 
 class YouTubeURLValidator:
     @staticmethod
     def check_existence(video_id):
         """Check if a YouTube video exists and is available using yt-dlp."""
+        import yt_dlp
+
         try:
             ydl_opts = {'quiet': True}
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+                # The extractor raises for unavailable videos, so the formats
+                # don't need to be processed to know that the video exists
+                ydl.extract_info(
+                    f"https://www.youtube.com/watch?v={video_id}",
+                    download=False, process=False)
             return True
         except yt_dlp.utils.DownloadError:
             return False
 
     @staticmethod
     def playlist_exists(playlist_url):
+        import yt_dlp
+
+        # Listing the first entry is enough to ensure the playlist exists.
+        # Watch URLs that carry a playlist are redirected to the playlist
+        # itself, so only the entries are left unresolved, not the redirect.
+        ydl_opts = {'quiet': True, 'extract_flat': 'in_playlist',
+                    'playlistend': 1}
         try:
-            playlist = Playlist(playlist_url)
-            # Try accessing the first video's title to ensure it exists
-            if playlist.videos[0]:
-                return True
-            else:
-                print("Playlist seems to exist but has no videos.")
-                return False
-        except (PytubeError, IndexError) as e:
+            with shared_youtube_dl(ydl_opts) as ydl:
+                playlist = ydl.extract_info(playlist_url, download=False)
+        except yt_dlp.utils.DownloadError as e:
             print(f"Failed to fetch playlist or playlist is empty: {e}")
             return False
-        except HTTPError as e:
-            print(f"Failed to retrieve a possible playlist due to HTTP Error {e.code}: {e.reason}")
+
+        if next(iter(playlist.get('entries') or []), None):
+            return True
+        else:
+            print("Playlist seems to exist but has no videos.")
             return False
 
     @staticmethod
-    def is_valid(url_or_video_id):
-        """Validate the URL or video ID."""
-        # Pattern for regular YouTube videos
-        url_pattern = r'(https?://)?(www\.)?(youtube\.com|youtu\.?be)/watch\?v=([0-9A-Za-z_-]{11})'
-        
-        # Pattern for YouTube Shorts
-        shorts_pattern = r'(https?://)?(www\.)?youtube\.com/shorts/([0-9A-Za-z_-]{11})'
-        
-        # Pattern for a direct video ID
-        video_id_pattern = r'^[0-9A-Za-z_-]{11}$'
+    def is_valid(url_or_video_id, cheap=False):
+        """Validate the URL or video ID.
+
+        Args:
+            url_or_video_id (str): A video URL, Shorts URL or video ID.
+            cheap (bool, optional): Only check the format of the URL or ID
+                and skip the network round trip that checks whether the
+                video exists, leaving that to whatever fetches the video
+                next. Defaults to False.
+
+        Returns:
+            tuple: (True, URL of the video) if valid, (False, None) otherwise.
+        """
+        # The format is checked first, so malformed input never reaches the
+        # network
+        match = _VIDEO_RE.fullmatch(url_or_video_id.strip())
+        if not match:
+            return False, None
+
+        # Exactly one of the named groups matches
+        video_id = match[match.lastgroup]
+        if not cheap and not YouTubeURLValidator.check_existence(video_id):
+            return False, None
 
-        # Check if the URL is a regular video
-        url_match = re.match(url_pattern, url_or_video_id)
-        if url_match:
-            video_id = url_match.group(4)
-            if YouTubeURLValidator.check_existence(video_id):
-                return True, url_or_video_id
-        
-        # Check if the URL is a YouTube Shorts video
-        shorts_match = re.match(shorts_pattern, url_or_video_id)
-        if shorts_match:
-            video_id = shorts_match.group(3)
-            if YouTubeURLValidator.check_existence(video_id):
-                # Convert Shorts URL to standard watch URL
-                full_url = f"https://www.youtube.com/watch?v={video_id}"
-                return True, full_url
+        if match.lastgroup == 'watch':
+            return True, match.string
 
-        # Check if it's a direct video ID
-        elif re.match(video_id_pattern, url_or_video_id):
-            if YouTubeURLValidator.check_existence(url_or_video_id):
-                full_url = f"https://www.youtube.com/watch?v={url_or_video_id}"
-                return True, full_url
-        
-        # If no matches
-        return False, None
+        # Convert Shorts URLs and video IDs to standard watch URLs
+        return True, f"https://www.youtube.com/watch?v={video_id}"
@@ -3,6 +3,8 @@ This module defines the VideoItem class used to represent video items in a
 list view, including methods to initialize and manage UI elements for each
 item.
 """
+import os
+
 from classes.download_thread import DownloadThread
 
 from PyQt6 import QtGui, QtCore
@@ -21,7 +23,13 @@ class VideoItem:
                                      downloaded.
         qt_item (list): List of QStandardItem objects for UI representation.
     """
-    def __init__(self, title, link, download_path):
+
+    # Shared by every completed row rather than built per row
+    _GRAY_BRUSH = QtGui.QBrush(QtGui.QColor('grey'))
+    _DEACTIVATED_FLAGS = (QtCore.Qt.ItemFlag.ItemIsSelectable |
+                          QtCore.Qt.ItemFlag.ItemIsUserTristate)
+
+    def __init__(self, title, link, download_path, completion_index=None):
         """
         Initializes a VideoItem instance, checks the download status,
         and creates the corresponding UI items.
@@ -30,12 +38,20 @@ class VideoItem:
             title (str): The title of the video.
             link (str): The link to the video.
             download_path (str): The file path of the video download.
+            completion_index (frozenset, optional): The complete downloads of
+                the download directory, as built by
+                DownloadThread.prebuild_completion_index. If None, the
+                directory is listed for this video alone.
         """
         self.title = title
         self.link = link
         self.download_path = download_path
-        self.is_download_complete = DownloadThread.is_download_complete(
-            self.download_path)
+        if completion_index is not None:
+            self.is_download_complete = \
+                os.path.basename(self.download_path) in completion_index
+        else:
+            self.is_download_complete = DownloadThread.is_download_complete(
+                self.download_path)
         self._create_qt_item()
 
     def _create_qt_item(self):
@@ -63,11 +79,21 @@ class VideoItem:
         Applies a gray foreground to the items and disables editing/checking
         if the video is marked as complete.
         """
-        gray_brush = QtGui.QBrush(QtGui.QColor('grey'))
-        for subitem in self.qt_item[:-1]:
-            subitem.setForeground(gray_brush)
-        self.item_checkbox.setFlags(QtCore.Qt.ItemFlag.ItemIsSelectable |
-                                    QtCore.Qt.ItemFlag.ItemIsUserTristate)
+        self.deactivate_row(self.qt_item)
+
+    @staticmethod
+    def deactivate_row(row_items):
+        """
+        Applies a gray foreground to a row of items and disables checking
+        its checkbox item.
+
+        Args:
+            row_items (list): The QStandardItem objects of a row, in column
+                              order.
+        """
+        for subitem in row_items[:-1]:
+            subitem.setForeground(VideoItem._GRAY_BRUSH)
+        row_items[0].setFlags(VideoItem._DEACTIVATED_FLAGS)
 
     def mark_as_complete(self):
         """Public method to deactivate UI items when the download is
@@ -6,6 +6,8 @@
 # and DownloadThread.
 # License: MIT License
 
+from types import MappingProxyType
+
 DEFAULT_VIDEO_FORMAT = 'Any'
 DEFAULT_AUDIO_FORMAT = 'mp3'
 DEFAULT_AUDIO_QUALITY = 'Best available'
@@ -58,7 +60,12 @@ settings_map = {
     }
 }
 
-KEYWORD = "externalId"
-KEYWORD_LEN = len(KEYWORD)
-OFFSET_TO_CHANNEL_ID = 3
+# The map is only ever read, so it is frozen to guard against accidental
+# changes
+settings_map = MappingProxyType(
+    {key: MappingProxyType(options) for key, options in settings_map.items()})
+
 MS_PER_SECOND = 1000
+PROGRESS_REPAINT_INTERVAL_MS = 50
+PROGRESS_EMIT_INTERVAL_MS = 250
+MAX_SIMULTANEOUS_DOWNLOADS = 4
@@ -17,15 +17,15 @@ from PyQt6.QtWidgets import QApplication
 
 from classes.mainwindow import MainWindow
 
-
-os.environ['SSL_CERT_FILE'] = certifi.where()
-
 # Important:
 # You need to run the following command to generate a Python ui file, e.g.
 #     pyuic6 form.ui -o ui_form.py
 
 
 def main():
+    # Located here rather than at import, and only if the environment
+    # doesn't already point to a certificate bundle
+    os.environ.setdefault('SSL_CERT_FILE', certifi.where())
     app = QApplication(sys.argv)
     widget = MainWindow()
     widget.reinit_model()